@@ -1,4 +1,4 @@
-from google import genai
+import functools
 from pydantic import BaseModel, ValidationError
 from log_exp_wrapper import log_exceptions
 import os
@@ -19,8 +19,46 @@ class Report(BaseModel):
     detailed_summary: str
     SOAP_note_so_far: SOAPNote
 
-# Initialize the Gemini client
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+# Upper bound for a single Gemini request (upload or generate), in seconds
+GEMINI_HTTP_TIMEOUT = int(os.getenv("GEMINI_HTTP_TIMEOUT", "120"))
+
+
+@functools.lru_cache(maxsize=1)
+def get_client():
+    """
+    Return the per-process Gemini client.
+
+    The SDK is imported on first use so importing this module stays cheap, and
+    the client (with its underlying HTTP connection pool) is reused across tasks.
+    Every request is bounded by GEMINI_HTTP_TIMEOUT seconds, since the thread
+    pool the workers run on does not enforce Celery time limits.
+    """
+    from google import genai
+    return genai.Client(
+        api_key=os.getenv("GEMINI_API_KEY"),
+        http_options={"timeout": GEMINI_HTTP_TIMEOUT * 1000},  # milliseconds
+    )
+
+
+def _generate_report(contents: list) -> Report:
+    """
+    Call the model with a Report response schema and parse its answer.
+    """
+    response = get_client().models.generate_content(
+        model="gemini-2.0-flash",
+        contents=contents,
+        config={
+            "response_mime_type": "application/json",
+            "response_schema": Report,
+        }
+    )
+
+    # Parse and return
+    try:
+        report = Report.model_validate_json(response.text)
+    except ValidationError as e:
+        raise RuntimeError(f"Failed to parse model response: {e}\nResponse was: {response.text}")
+    return report
 
 
 @log_exceptions
@@ -40,6 +78,8 @@ def generate_clinical_report(
     Returns:
         Report: Parsed Pydantic Report object with detailed summary and SOAP note.
     """
+    client = get_client()
+
     # Upload audio file
     uploaded_file = client.files.upload(file=audio_file_path)
 
@@ -61,20 +101,37 @@ def generate_clinical_report(
     )
     prompt = "\n\n".join(prompt_parts)
 
-    # Call the model
-    response = client.models.generate_content(
-        model="gemini-2.0-flash",
-        contents=[prompt, uploaded_file],
-        config={
-            "response_mime_type": "application/json",
-            "response_schema": Report,
-        }
-    )
+    return _generate_report([prompt, uploaded_file])
 
-    # Parse and return
-    try:
-        report = Report.parse_raw(response.text)
-    except ValidationError as e:
-        raise RuntimeError(f"Failed to parse model response: {e}\nResponse was: {response.text}")
-    return report
 
+@log_exceptions
+def merge_clinical_reports(
+    visit_type: str,
+    first_report: Report,
+    second_report: Report,
+) -> Report:
+    """
+    Merge two reports covering consecutive parts of the same consultation.
+
+    Args:
+        visit_type: The type of clinical visit (e.g., "Initial Consultation", "Follow-up", "Telemedicine").
+        first_report: Report for the earlier part of the recording.
+        second_report: Report for the later part of the recording.
+
+    Returns:
+        Report: Single Report covering both parts, keeping the evidence of each.
+    """
+    prompt = "\n\n".join([
+        f"Type of Visit: {visit_type}",
+        "You are given two reports generated from consecutive parts of one clinical consultation.",
+        "Report for the earlier part:",
+        str(first_report),
+        "Report for the later part:",
+        str(second_report),
+        "Your tasks:\n"
+        "1. Combine both detailed summaries into one, in chronological order.\n"
+        "2. Merge the SOAP notes into one, keeping every exact evidence from both reports "
+        "and letting later findings update earlier ones.",
+    ])
+
+    return _generate_report([prompt])
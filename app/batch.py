@@ -0,0 +1,160 @@
+"""
+Offline batch mode for complete recordings.
+
+A recording is split at pauses, every segment is processed in parallel and
+the segment reports are merged pairwise (tree style) into one Report. With
+C concurrent calls (max_workers, BATCH_MAX_WORKERS=16 by default locally, or
+the free slots of the `batch` Celery workers) the wall-clock time is about
+ceil(N / C) segment waves plus ceil(log2(N)) merge rounds, so recordings of
+up to C segments take as long as their slowest segment plus the merges.
+
+Usage:
+    python -m app.batch recording.wav --visit-type "General Checkup" [--mode celery]
+"""
+import argparse
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from celery import group
+from celery.utils.time import get_exponential_backoff_interval
+from log_exp_wrapper import log_exceptions, logger
+from app.agent import Report, generate_clinical_report, merge_clinical_reports
+from app.tasks import process_segment, merge_reports
+from app.redis_store import set_visit_type, set_visit_status, set_chunk_report
+from app.segments import get_audio_duration, split_at_pauses, tree_merge
+
+BATCH_OUTPUT_DIR = os.getenv("BATCH_OUTPUT_DIR", "audio_chunks")
+
+# Default cap on concurrent Gemini calls in local mode
+BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "16"))
+
+# Same retry policy as the Celery tasks: 3 retries, exponential backoff with
+# full jitter (retry_backoff=True, retry_jitter=True, capped at 600s).
+BATCH_MAX_RETRIES = 3
+
+
+def _with_retries(func, *args):
+    for retries in range(BATCH_MAX_RETRIES + 1):
+        try:
+            return func(*args)
+        except Exception as e:
+            if retries == BATCH_MAX_RETRIES:
+                raise
+            countdown = get_exponential_backoff_interval(
+                factor=1, retries=retries, maximum=600, full_jitter=True
+            )
+            logger.warning(f"{func.__name__} failed ({e}), retrying in {countdown}s")
+            time.sleep(countdown)
+
+
+def _run_local(visit_type: str, segments: list[str], max_workers: Optional[int], segment_folder: str) -> Report:
+    workers = min(len(segments), BATCH_MAX_WORKERS if max_workers is None else max_workers)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        reports = list(pool.map(
+            lambda path: _with_retries(generate_clinical_report, visit_type, path), segments
+        ))
+        # The segment audio is not needed once every segment has its report
+        shutil.rmtree(segment_folder, ignore_errors=True)
+        return tree_merge(
+            reports,
+            lambda pairs: list(pool.map(
+                lambda pair: _with_retries(merge_clinical_reports, visit_type, *pair), pairs
+            )),
+        )
+
+
+def _collect(result) -> list:
+    try:
+        return result.get()
+    except Exception:
+        # Stop queued siblings and pending retries before their audio is deleted
+        result.revoke()
+        raise
+
+
+def _run_celery(visit_type: str, segments: list[str]) -> Report:
+    reports = _collect(group(process_segment.s(visit_type, path) for path in segments).apply_async())
+    report = tree_merge(
+        reports,
+        lambda pairs: _collect(group(merge_reports.s(visit_type, *pair) for pair in pairs).apply_async()),
+    )
+    return Report.model_validate(report)
+
+
+@log_exceptions
+def process_recording(
+    visit_type: str,
+    audio_path: str,
+    mode: str = "local",
+    max_workers: Optional[int] = None,
+    output_folder: str = BATCH_OUTPUT_DIR,
+) -> dict:
+    """
+    Generate one Report for a complete recording.
+
+    Args:
+        visit_type: The type of clinical visit (e.g., "Initial Consultation", "Follow-up", "Telemedicine").
+        audio_path: Path to the complete recording (16-bit WAV).
+        mode: "local" to process segments on a thread pool, "celery" to fan out to the workers.
+        max_workers: Cap on concurrent Gemini calls in local mode; BATCH_MAX_WORKERS by default.
+        output_folder: Folder the segment files are written to (must be shared with the workers in celery mode).
+
+    Returns:
+        dict: visit_id, the merged report and throughput figures.
+    """
+    if mode not in ("local", "celery"):
+        raise ValueError(f"Unknown batch mode: {mode}")
+
+    start = time.perf_counter()
+    visit_id = str(uuid.uuid4())
+    set_visit_type(visit_id, "created", visit_type)
+
+    segment_folder = os.path.join(output_folder, visit_id)
+    try:
+        segments = split_at_pauses(audio_path, segment_folder)
+        logger.info(f"Split {audio_path} into {len(segments)} segments")
+        set_visit_status(visit_id, f"processing {len(segments)} segments")
+        if mode == "celery":
+            report = _run_celery(visit_type, segments)
+        else:
+            report = _run_local(visit_type, segments, max_workers, segment_folder)
+    except Exception:
+        set_visit_status(visit_id, "Failed...")
+        raise
+    finally:
+        shutil.rmtree(segment_folder, ignore_errors=True)
+    set_chunk_report(visit_id, len(segments), report, is_final=True)
+
+    audio_hours = get_audio_duration(audio_path) / 3600
+    wall_hours = (time.perf_counter() - start) / 3600
+    throughput = audio_hours / wall_hours if wall_hours else 0.0
+    logger.info(f"Batch {visit_id}: {audio_hours * 60:.1f} audio minutes, {throughput:.1f} audio-hours per hour")
+    return {
+        "visit_id": visit_id,
+        "report": report,
+        "segments": len(segments),
+        "audio_hours": audio_hours,
+        "wall_hours": wall_hours,
+        "throughput": throughput,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a report for a complete recording")
+    parser.add_argument("audio_path", help="Path to the recording (16-bit WAV)")
+    parser.add_argument("--visit-type", default="General Checkup")
+    parser.add_argument("--mode", choices=("local", "celery"), default="local")
+    parser.add_argument("--max-workers", type=int, default=None,
+                        help="Cap on concurrent Gemini calls in local mode (default: BATCH_MAX_WORKERS, 16)")
+    args = parser.parse_args()
+    result = process_recording(args.visit_type, args.audio_path, args.mode, args.max_workers)
+    print(f"visit_id: {result['visit_id']}")
+    print(f"segments: {result['segments']}")
+    print(f"throughput: {result['throughput']:.1f} audio-hours per wall-clock hour")
+
+
+if __name__ == "__main__":
+    main()
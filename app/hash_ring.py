@@ -0,0 +1,64 @@
+import bisect
+import hashlib
+from urllib.parse import urlsplit
+
+
+def _hash(key: str) -> int:
+    return int(hashlib.md5(key.encode()).hexdigest(), 16)
+
+
+def shard_name(url: str) -> str:
+    """
+    Derive a stable shard name (host:port/db) from a Redis URL.
+
+    Credentials, scheme and trailing slashes are ignored so that rotating a
+    password or respelling the URL does not move any keys.
+    """
+    parts = urlsplit(url)
+    db = parts.path.strip("/") or "0"
+    return f"{parts.hostname or 'localhost'}:{parts.port or 6379}/{db}"
+
+
+def parse_shards(spec: str) -> dict[str, str]:
+    """
+    Parse a comma separated shard list into {name: url}.
+
+    Entries are either `name=redis://...` or a bare URL, in which case the
+    name is derived with shard_name().
+    """
+    shards = {}
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, sep, url = entry.partition("=")
+        if not sep or "://" in name:
+            name, url = shard_name(entry), entry
+        name, url = name.strip(), url.strip()
+        if name in shards and shards[name] != url:
+            raise ValueError(f"Shard name {name} is used for both {shards[name]} and {url}")
+        shards[name] = url
+    return shards
+
+
+class HashRing:
+    """
+    Consistent hash ring mapping visit ids onto shard names.
+
+    Adding a shard only moves the keys that land on its virtual nodes
+    (roughly 1/N of the data), which keeps rebalancing cheap.
+    """
+
+    def __init__(self, nodes: list[str], vnodes: int = 160):
+        if not nodes:
+            raise ValueError("HashRing needs at least one node")
+        self.nodes = list(nodes)
+        self.vnodes = vnodes
+        self._ring = sorted(
+            (_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(vnodes)
+        )
+        self._keys = [point for point, _ in self._ring]
+
+    def get_node(self, visit_id: str) -> str:
+        idx = bisect.bisect(self._keys, _hash(visit_id)) % len(self._keys)
+        return self._ring[idx][1]
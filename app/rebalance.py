@@ -0,0 +1,155 @@
+"""
+Move visit keys to their owning shard after the shard list changes.
+
+Procedure (see README):
+    1. Restart every worker and API process at once with
+       VISIT_REDIS_SHARDS=<new> and VISIT_REDIS_PREVIOUS_SHARDS=<old>.
+       Visits are then always written on the new ring, and a visit still on
+       its previous shard is copied over on first access.
+    2. python -m app.rebalance
+       (reads both settings from the environment, or pass --old/--new;
+       --vnodes must match VISIT_REDIS_VNODES of the running processes)
+    3. Unset VISIT_REDIS_PREVIOUS_SHARDS once the run reports no conflicts.
+
+Keys are copied with DUMP/RESTORE (keeping the TTL) without ever replacing a
+key the target already holds, and the source key is deleted only if it still
+holds the value that was copied.
+"""
+import argparse
+import os
+import redis
+from log_exp_wrapper import log_exceptions, logger
+from app.hash_ring import HashRing, parse_shards
+from app.redis_store import VISIT_REDIS_VNODES
+
+# Delete KEYS[i] only if it still serializes to ARGV[i]; atomic per batch.
+_DELETE_IF_UNCHANGED = """
+local deleted = 0
+for i, key in ipairs(KEYS) do
+    if redis.call('DUMP', key) == ARGV[i] then
+        redis.call('DEL', key)
+        deleted = deleted + 1
+    end
+end
+return deleted
+"""
+
+
+def _batches(iterable, size: int):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _move_batch(src, clients: dict, owners: dict, delete_if_unchanged, dry_run: bool, stats: dict) -> None:
+    keys = list(owners)
+
+    # One round trip for all DUMP/PTTL of the batch
+    pipe = src.pipeline(transaction=False)
+    for key in keys:
+        pipe.dump(key)
+        pipe.pttl(key)
+    results = pipe.execute()
+    dumped = {
+        key: (payload, ttl)
+        for key, payload, ttl in zip(keys, results[::2], results[1::2])
+        if payload is not None
+    }
+    if dry_run:
+        for key in dumped:
+            stats["moved"][owners[key]] += 1
+        return
+
+    # One round trip per target shard for the RESTOREs
+    copied = []
+    by_target = {}
+    for key in dumped:
+        by_target.setdefault(owners[key], []).append(key)
+    for target, target_keys in by_target.items():
+        pipe = clients[target].pipeline(transaction=False)
+        for key in target_keys:
+            payload, ttl = dumped[key]
+            pipe.restore(key, max(ttl, 0), payload)
+        for key, result in zip(target_keys, pipe.execute(raise_on_error=False)):
+            if not isinstance(result, Exception):
+                stats["moved"][target] += 1
+            elif "BUSYKEY" not in str(result):
+                # Keep the source key so the next run retries it
+                logger.error(f"Failed to restore {key} on {target}: {result}")
+                stats["failed"] += 1
+                continue
+            # Restored now, or the target already had it (copied on access)
+            copied.append(key)
+
+    # One atomic script call deletes the source keys that did not change meanwhile
+    if copied:
+        deleted = delete_if_unchanged(keys=copied, args=[dumped[key][0] for key in copied])
+        stats["conflicts"] += len(copied) - deleted
+
+
+@log_exceptions
+def rebalance(old_shards: dict[str, str], new_shards: dict[str, str], dry_run: bool = False,
+              batch_size: int = 500, vnodes: int = VISIT_REDIS_VNODES) -> dict:
+    """
+    Migrate every `visit:*` key to the shard that owns it on the new ring.
+
+    Args:
+        old_shards: {name: url} of the shards the data currently lives on.
+        new_shards: {name: url} of the new layout (usually old_shards plus the added shards).
+        dry_run: Only count the keys that would move.
+        batch_size: Keys per SCAN page; each batch costs one DUMP/PTTL pipeline,
+            one RESTORE pipeline per target shard and one delete script call.
+        vnodes: Virtual nodes per shard, must match the store configuration.
+
+    Returns:
+        dict: Keys scanned, moved per destination shard, restore failures and
+        conflicts (source keys written during the run, left in place).
+    """
+    new_ring = HashRing(list(new_shards), vnodes)
+    clients = {
+        name: redis.Redis.from_url(url)
+        for name, url in {**old_shards, **new_shards}.items()
+    }
+    stats = {"scanned": 0, "moved": {name: 0 for name in new_shards}, "failed": 0, "conflicts": 0}
+
+    for source in old_shards:
+        src = clients[source]
+        delete_if_unchanged = src.register_script(_DELETE_IF_UNCHANGED)
+        for keys in _batches(src.scan_iter(match="visit:*", count=batch_size), batch_size):
+            stats["scanned"] += len(keys)
+            owners = {}
+            for key in keys:
+                target = new_ring.get_node(key.decode().split(":", 1)[1])
+                if target != source:
+                    owners[key] = target
+            if owners:
+                _move_batch(src, clients, owners, delete_if_unchanged, dry_run, stats)
+
+    logger.info(f"Rebalance finished: {stats}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebalance visit keys across Redis shards")
+    parser.add_argument("--old", default=os.getenv("VISIT_REDIS_PREVIOUS_SHARDS"),
+                        help="Comma separated current shards (name=url or url), defaults to VISIT_REDIS_PREVIOUS_SHARDS")
+    parser.add_argument("--new", default=os.getenv("VISIT_REDIS_SHARDS"),
+                        help="Comma separated target shards (name=url or url), defaults to VISIT_REDIS_SHARDS")
+    parser.add_argument("--dry-run", action="store_true", help="Only report how many keys would move")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--vnodes", type=int, default=VISIT_REDIS_VNODES,
+                        help="Virtual nodes per shard; must equal VISIT_REDIS_VNODES of the running processes")
+    args = parser.parse_args()
+    if not args.old or not args.new:
+        parser.error("both --old and --new (or their environment variables) are required")
+    stats = rebalance(parse_shards(args.old), parse_shards(args.new), args.dry_run, args.batch_size, args.vnodes)
+    print(stats)
+
+
+if __name__ == "__main__":
+    main()
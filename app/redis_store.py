@@ -1,22 +1,114 @@
 import os
+import functools
 import redis
+from redis.cluster import RedisCluster
 from log_exp_wrapper import log_exceptions
+from app.hash_ring import HashRing, parse_shards
 
 # Redis URL for storing visit data (status & reports)
 VISIT_REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/1")
 
-# Initialize Redis client
-visit_redis = redis.Redis.from_url(VISIT_REDIS_URL)
+# Comma separated list of shards for the visit store, as `name=url` or bare
+# URLs (named host:port/db). The ring hashes the names, never the full URL.
+# Falls back to the single REDIS_URL so existing deployments keep working.
+VISIT_REDIS_SHARDS = parse_shards(os.getenv("VISIT_REDIS_SHARDS", VISIT_REDIS_URL))
+
+# Shard list in effect before the last change. Set only while app.rebalance
+# runs: visits not yet moved are copied from their previous shard on first access.
+VISIT_REDIS_PREVIOUS_SHARDS = parse_shards(os.getenv("VISIT_REDIS_PREVIOUS_SHARDS", ""))
+
+# Optional Redis Cluster endpoint; when set it replaces the shard list and the
+# cluster does the slot routing itself.
+VISIT_REDIS_CLUSTER_URL = os.getenv("VISIT_REDIS_CLUSTER_URL")
+
+# Virtual nodes per shard on the hash ring. Part of the ring layout: it must
+# be identical in every process and in app.rebalance, or reads go to the wrong shard.
+VISIT_REDIS_VNODES = int(os.getenv("VISIT_REDIS_VNODES", "160"))
+
+
+# Initialize Redis clients (connections are opened on first use)
+if VISIT_REDIS_CLUSTER_URL:
+    visit_ring = None
+    previous_ring = None
+    visit_clients = {}
+else:
+    visit_ring = HashRing(list(VISIT_REDIS_SHARDS), VISIT_REDIS_VNODES)
+    previous_ring = (
+        HashRing(list(VISIT_REDIS_PREVIOUS_SHARDS), VISIT_REDIS_VNODES)
+        if VISIT_REDIS_PREVIOUS_SHARDS else None
+    )
+    visit_clients = {
+        name: redis.Redis.from_url(url)
+        for name, url in {**VISIT_REDIS_PREVIOUS_SHARDS, **VISIT_REDIS_SHARDS}.items()
+    }
+
+
+@functools.lru_cache(maxsize=1)
+def get_cluster_client() -> RedisCluster:
+    """
+    Return the Redis Cluster client, created on first use.
+
+    RedisCluster discovers the cluster topology when it is built, so this is
+    kept out of import time.
+    """
+    return RedisCluster.from_url(VISIT_REDIS_CLUSTER_URL)
+
+
+def get_visit_clients() -> list:
+    """
+    Return every client of the visit store (one per shard, or the cluster client).
+    """
+    if VISIT_REDIS_CLUSTER_URL:
+        return [get_cluster_client()]
+    return list(visit_clients.values())
+
+
+def copy_visit_key(src, dst, key: str) -> bool:
+    """
+    Copy a key between shards (keeping its TTL) unless the target already has it.
+
+    Returns:
+        bool: True if the key was copied.
+    """
+    pipe = src.pipeline()
+    pipe.dump(key)
+    pipe.pttl(key)
+    payload, ttl = pipe.execute()
+    if payload is None:
+        return False
+    try:
+        dst.restore(key, max(ttl, 0), payload)
+    except redis.ResponseError as e:
+        # BUSYKEY: the target already holds a (newer) copy, never overwrite it
+        if "BUSYKEY" in str(e):
+            return False
+        raise
+    return True
+
+
+def get_visit_redis(visit_id: str):
+    """
+    Return the Redis client owning the given visit.
+    """
+    if visit_ring is None:
+        return get_cluster_client()
+    client = visit_clients[visit_ring.get_node(visit_id)]
+    if previous_ring is not None:
+        previous = visit_clients[previous_ring.get_node(visit_id)]
+        key = f"visit:{visit_id}"
+        if previous is not client and not client.exists(key):
+            copy_visit_key(previous, client, key)
+    return client
 
 
 def set_visit_status(visit_id: str, status: str) -> None:
     """
     Update the status of a visit.
     """
-    visit_redis.hset(f"visit:{visit_id}", "status", status)
+    get_visit_redis(visit_id).hset(f"visit:{visit_id}", "status", status)
 
 def set_visit_type(visit_id: str, status: str, visit_type: str) -> None:
-    visit_redis.hset(f"visit:{visit_id}", mapping={
+    get_visit_redis(visit_id).hset(f"visit:{visit_id}", mapping={
         "status": status,
         "type_of_visit": visit_type
     })
@@ -26,7 +118,7 @@ def get_visit_status(visit_id: str) -> str:
     """
     Retrieve the status of a visit.
     """
-    value = visit_redis.hget(f"visit:{visit_id}", "status")
+    value = get_visit_redis(visit_id).hget(f"visit:{visit_id}", "status")
     return value.decode() if value else None
 
 @log_exceptions
@@ -35,9 +127,11 @@ def set_chunk_report(visit_id: str,chunk_number:int, report,is_final=False) -> N
     Save the generated report for a visit.
     """
     print(report)
+    visit_redis = get_visit_redis(visit_id)
     if is_final:
         visit_redis.hset(f"visit:{visit_id}", mapping={"report": str(report), "status": "completed"})
-    visit_redis.hset(f"visit:{visit_id}", mapping={"report": str(report), "status": f"Processed chunk number: {chunk_number} completed"})
+    else:
+        visit_redis.hset(f"visit:{visit_id}", mapping={"report": str(report), "status": f"Processed chunk number: {chunk_number} completed"})
 
 
 
@@ -45,5 +139,5 @@ def get_visit_report(visit_id: str) -> str:
     """
     Retrieve the generated report for a visit.
     """
-    data = visit_redis.hgetall(f"visit:{visit_id}")
-    return data.get(b"report").decode() if data.get(b"report") else None
\ No newline at end of file
+    data = get_visit_redis(visit_id).hgetall(f"visit:{visit_id}")
+    return data.get(b"report").decode() if data.get(b"report") else None
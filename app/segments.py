@@ -0,0 +1,121 @@
+"""
+Splitting recordings into segments and merging their results.
+
+Only the standard library is used here so these helpers can run (and be
+tested) without the Redis, Celery or Gemini dependencies.
+"""
+import math
+import os
+import sys
+import wave
+from array import array
+from typing import Callable
+
+
+def get_audio_duration(audio_path: str) -> float:
+    """
+    Return the duration of a WAV file in seconds.
+    """
+    with wave.open(audio_path, "rb") as wf:
+        return wf.getnframes() / wf.getframerate()
+
+
+def _window_rms(data: bytes, stride: int = 4) -> float:
+    samples = array("h", data)
+    if sys.byteorder == "big":
+        samples.byteswap()
+    samples = samples[::stride]
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(s * s for s in samples) / len(samples))
+
+
+def split_at_pauses(
+    audio_path: str,
+    output_folder: str,
+    min_segment: float = 60.0,
+    max_segment: float = 180.0,
+    min_pause: float = 0.5,
+    silence_threshold: float = 500.0,
+    window: float = 0.05,
+) -> list[str]:
+    """
+    Split a 16-bit WAV recording into segments, cutting inside pauses.
+
+    Args:
+        audio_path: Path to the complete recording.
+        output_folder: Folder the segment files are written to.
+        min_segment: Minimum segment length in seconds before a pause may end it.
+        max_segment: Segments are cut here even if no pause was found.
+        min_pause: Length in seconds of quiet audio that counts as a pause.
+        silence_threshold: RMS amplitude below which a window is considered quiet.
+        window: Analysis window in seconds.
+
+    Returns:
+        list[str]: Paths of the segment files, in recording order.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    base = os.path.splitext(os.path.basename(audio_path))[0]
+    segments = []
+
+    with wave.open(audio_path, "rb") as src:
+        if src.getsampwidth() != 2:
+            raise ValueError(f"Only 16-bit WAV files are supported, got {src.getsampwidth() * 8}-bit")
+        params = src.getparams()
+        rate = src.getframerate()
+        window_frames = max(1, int(rate * window))
+
+        writer = None
+        segment_frames = 0
+        quiet_frames = 0
+        while True:
+            data = src.readframes(window_frames)
+            if not data:
+                break
+            if writer is None:
+                path = os.path.join(output_folder, f"{base}_segment_{len(segments) + 1:03d}.wav")
+                writer = wave.open(path, "wb")
+                writer.setparams(params)
+                segments.append(path)
+                segment_frames = 0
+                quiet_frames = 0
+
+            writer.writeframes(data)
+            frames = len(data) // (2 * src.getnchannels())
+            segment_frames += frames
+            quiet_frames = quiet_frames + frames if _window_rms(data) < silence_threshold else 0
+
+            length = segment_frames / rate
+            # Do not leave a sliver of audio as its own segment
+            remaining = (src.getnframes() - src.tell()) / rate
+            at_pause = quiet_frames / rate >= min_pause and remaining >= min_segment / 2
+            if length >= max_segment or (length >= min_segment and at_pause):
+                writer.close()
+                writer = None
+
+        if writer is not None:
+            writer.close()
+
+    return segments
+
+
+def tree_merge(reports: list, merge_pairs: Callable[[list[tuple]], list]):
+    """
+    Reduce reports pairwise, one round at a time, keeping recording order.
+
+    Args:
+        reports: Segment reports in recording order.
+        merge_pairs: Merges a list of (earlier, later) pairs, ideally in parallel.
+
+    Returns:
+        The single merged report.
+    """
+    if not reports:
+        raise ValueError("No reports to merge")
+    while len(reports) > 1:
+        pairs = [(reports[i], reports[i + 1]) for i in range(0, len(reports) - 1, 2)]
+        merged = merge_pairs(pairs)
+        if len(reports) % 2:
+            merged.append(reports[-1])
+        reports = merged
+    return reports[0]
@@ -2,15 +2,47 @@ import os
 from celery import Celery
 from app.redis_store import set_chunk_report,set_visit_status,get_visit_report
 from log_exp_wrapper import log_exceptions
-from app.agent import generate_clinical_report
+from app.agent import Report, generate_clinical_report, merge_clinical_reports
 
 
+# Broker/backend are configured independently of the visit store
+# (REDIS_URL / VISIT_REDIS_SHARDS), so queue traffic can live on its own instance.
 CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379')
 CELERY_BACKEND_URL = os.environ.get('CELERY_BACKEND_URL','redis://localhost:6379')
 
 # Initialize Celery
 celery_app = Celery(__name__, broker=CELERY_BROKER_URL, backend=CELERY_BACKEND_URL)
 
+# Worker profile: chunk tasks are long, I/O bound calls to Gemini, so take one
+# task at a time and ack only after it finished. Run the worker on a thread
+# pool (`-P threads`, see README). The thread pool does not enforce
+# soft_time_limit/time_limit; hung calls are bounded instead by the Gemini
+# client's HTTP timeout (GEMINI_HTTP_TIMEOUT in app.agent), which must stay
+# well below the broker visibility timeout or an unacked task is redelivered
+# and the chunk is processed twice. `-P prefork` enforces the time limits at
+# the cost of one process (and client) per concurrent task.
+# worker_pool is only set when CELERY_WORKER_POOL is given: Celery lets a
+# configured pool override an explicit `-P prefork` on the command line.
+CELERY_WORKER_POOL = os.environ.get('CELERY_WORKER_POOL')
+CELERY_WORKER_CONCURRENCY = int(os.environ.get('CELERY_WORKER_CONCURRENCY', '8'))
+
+celery_app.conf.update(
+    worker_concurrency=CELERY_WORKER_CONCURRENCY,
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    broker_pool_limit=CELERY_WORKER_CONCURRENCY,
+)
+if CELERY_WORKER_POOL:
+    celery_app.conf.worker_pool = CELERY_WORKER_POOL
+
+# Offline batch work (app.batch) gets its own queue so backlog recordings never
+# delay live chunks; run dedicated workers for it with `-Q batch`.
+celery_app.conf.task_routes = {
+    "process_segment": {"queue": "batch"},
+    "merge_reports": {"queue": "batch"},
+}
+
 if os.name == 'nt':  # Windows
     celery_app.conf.update(
         broker_connection_retry_on_startup=True,
@@ -38,8 +70,37 @@ def process_chunk(visit_id: str,chunk_number:int, audio_path: str,is_final = Fal
     except Exception as e:
         set_visit_status(visit_id,"Failed...")
         raise e
-    
 
 
+@celery_app.task(
+    name="process_segment",
+    autoretry_for=(Exception,),
+    retry_kwargs={"max_retries": 3, "countdown": 60},
+    retry_backoff=True,
+    retry_jitter=True,
+    soft_time_limit=300
+)
+def process_segment(visit_type: str, audio_path: str) -> dict:
+    """
+    Celery task: extract a standalone report from one segment of a recording.
+    """
+    return generate_clinical_report(visit_type, audio_path).model_dump()
 
 
+@celery_app.task(
+    name="merge_reports",
+    autoretry_for=(Exception,),
+    retry_kwargs={"max_retries": 3, "countdown": 60},
+    retry_backoff=True,
+    retry_jitter=True,
+    soft_time_limit=300
+)
+def merge_reports(visit_type: str, first_report: dict, second_report: dict) -> dict:
+    """
+    Celery task: merge the reports of two consecutive parts of a recording.
+    """
+    return merge_clinical_reports(
+        visit_type,
+        Report.model_validate(first_report),
+        Report.model_validate(second_report),
+    ).model_dump()
@@ -0,0 +1,110 @@
+"""
+Celery worker entry point with warm start.
+
+Run the worker with:
+    celery -A app.worker worker --loglevel=info
+
+Measure how long a fresh worker takes to become ready with:
+    python -m app.worker
+"""
+import time
+from celery import signals
+from log_exp_wrapper import logger
+from app.tasks import celery_app
+from app.agent import Report, get_client
+from app.redis_store import get_visit_clients
+
+
+def warm_up() -> dict:
+    """
+    Prepare the current process for processing chunks.
+
+    Builds the Gemini client (and its HTTP connection pool), compiles the
+    Report schema and opens a connection to every visit store shard, so the
+    first task does not pay for any of it.
+
+    Returns:
+        dict: Seconds spent on each step.
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    get_client()
+    timings["gemini_client"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    Report.model_json_schema()
+    Report.model_validate({
+        "detailed_summary": "",
+        "SOAP_note_so_far": {
+            section: {"parameter": "N/A", "evidence": []}
+            for section in ("Subjective", "Objective", "Assessment", "Plan")
+        },
+    })
+    timings["report_schema"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for client in get_visit_clients():
+        client.ping()
+    timings["visit_store"] = time.perf_counter() - start
+
+    logger.info(f"Worker warm up finished: {timings}")
+    return timings
+
+
+def _is_prefork(pool_cls) -> bool:
+    name = pool_cls if isinstance(pool_cls, str) else getattr(pool_cls, "__module__", "")
+    return "prefork" in name
+
+
+@signals.worker_init.connect
+def _warm_main_process(sender=None, **kwargs):
+    # Prefork children warm themselves in worker_process_init; building the
+    # client before forking would share sockets between processes.
+    if not _is_prefork(getattr(sender, "pool_cls", celery_app.conf.worker_pool)):
+        warm_up()
+
+
+@signals.worker_process_init.connect
+def _warm_child_process(**kwargs):
+    warm_up()
+
+
+_COLD_START = """
+import json, time
+start = time.perf_counter()
+from app.worker import warm_up
+timings = {"import_worker": time.perf_counter() - start}
+timings.update(warm_up())
+timings["total"] = time.perf_counter() - start
+print(json.dumps(timings))
+"""
+
+
+def benchmark_startup(runs: int = 3) -> list[dict]:
+    """
+    Time cold worker starts (imports plus warm up) in fresh interpreters.
+
+    Args:
+        runs: Number of interpreters to start.
+
+    Returns:
+        list[dict]: Seconds spent on each step, one dict per run.
+    """
+    import json
+    import subprocess
+    import sys
+
+    results = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", _COLD_START],
+            check=True, capture_output=True, text=True,
+        )
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return results
+
+
+if __name__ == "__main__":
+    for run, timings in enumerate(benchmark_startup(), start=1):
+        print(f"run {run}: " + ", ".join(f"{step}={seconds:.3f}s" for step, seconds in timings.items()))
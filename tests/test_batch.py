@@ -0,0 +1,97 @@
+import threading
+import pytest
+
+pytest.importorskip("celery")
+pytest.importorskip("pydantic")
+pytest.importorskip("redis")
+
+from app import batch
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(batch.time, "sleep", lambda seconds: None)
+
+
+def test_with_retries_recovers_from_transient_errors():
+    calls = []
+
+    def flaky(value):
+        calls.append(value)
+        if len(calls) < 3:
+            raise RuntimeError("429")
+        return value * 2
+
+    assert batch._with_retries(flaky, 21) == 42
+    assert len(calls) == 3
+
+
+def test_with_retries_gives_up_after_max_retries():
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise RuntimeError("500")
+
+    with pytest.raises(RuntimeError):
+        batch._with_retries(broken)
+    assert len(calls) == batch.BATCH_MAX_RETRIES + 1
+
+
+def test_run_local_caps_concurrency_and_retries(monkeypatch, tmp_path):
+    lock = threading.Lock()
+    state = {"running": 0, "peak": 0, "failed": set()}
+
+    def generate_clinical_report(visit_type, path):
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        try:
+            # Every segment fails once before succeeding
+            if path not in state["failed"]:
+                state["failed"].add(path)
+                raise RuntimeError("429")
+            return path
+        finally:
+            with lock:
+                state["running"] -= 1
+
+    def merge_clinical_reports(visit_type, first, second):
+        return first + second
+
+    monkeypatch.setattr(batch, "generate_clinical_report", generate_clinical_report)
+    monkeypatch.setattr(batch, "merge_clinical_reports", merge_clinical_reports)
+    segment_folder = tmp_path / "segments"
+    segment_folder.mkdir()
+
+    segments = [f"s{i:02d}" for i in range(20)]
+    assert batch._run_local("followup", segments, 4, str(segment_folder)) == "".join(segments)
+    assert state["peak"] <= 4
+    assert not segment_folder.exists()
+
+
+class FakeGroupResult:
+    def __init__(self, error=None):
+        self.error = error
+        self.revoked = False
+
+    def get(self):
+        if self.error:
+            raise self.error
+        return ["ok"]
+
+    def revoke(self):
+        self.revoked = True
+
+
+def test_collect_revokes_group_on_failure():
+    result = FakeGroupResult(RuntimeError("segment failed"))
+    with pytest.raises(RuntimeError):
+        batch._collect(result)
+    assert result.revoked
+
+
+def test_collect_returns_results():
+    result = FakeGroupResult()
+    assert batch._collect(result) == ["ok"]
+    assert not result.revoked
@@ -0,0 +1,52 @@
+import pytest
+from app.hash_ring import HashRing, parse_shards, shard_name
+
+
+VISIT_IDS = [f"visit-{i}" for i in range(5000)]
+
+
+def test_same_nodes_same_mapping():
+    first = HashRing(["a", "b", "c"])
+    second = HashRing(["c", "a", "b"])
+    assert all(first.get_node(v) == second.get_node(v) for v in VISIT_IDS)
+
+
+def test_adding_node_only_moves_keys_to_it():
+    old = HashRing(["a", "b", "c"])
+    new = HashRing(["a", "b", "c", "d"])
+    moved = [v for v in VISIT_IDS if old.get_node(v) != new.get_node(v)]
+    assert all(new.get_node(v) == "d" for v in moved)
+    # Roughly a quarter of the keys should move to the new node
+    assert 0.15 < len(moved) / len(VISIT_IDS) < 0.35
+
+
+def test_every_node_gets_keys():
+    ring = HashRing(["a", "b", "c"])
+    assert {ring.get_node(v) for v in VISIT_IDS} == {"a", "b", "c"}
+
+
+def test_empty_ring_rejected():
+    with pytest.raises(ValueError):
+        HashRing([])
+
+
+def test_shard_name_ignores_credentials_and_spelling():
+    assert shard_name("redis://a:6379/1") == "a:6379/1"
+    assert shard_name("redis://a:6379/1/") == "a:6379/1"
+    assert shard_name("rediss://user:secret@a:6379/1") == "a:6379/1"
+    assert shard_name("redis://a") == "a:6379/0"
+
+
+def test_parse_shards_named_and_bare():
+    shards = parse_shards("x=redis://a:6379/1, redis://:pw@b:6380/2,,")
+    assert shards == {"x": "redis://a:6379/1", "b:6380/2": "redis://:pw@b:6380/2"}
+
+
+def test_parse_shards_url_with_query_is_bare():
+    url = "redis://a:6379/1?ssl_cert_reqs=none"
+    assert parse_shards(url) == {"a:6379/1": url}
+
+
+def test_parse_shards_rejects_conflicting_names():
+    with pytest.raises(ValueError):
+        parse_shards("x=redis://a:6379/1,x=redis://b:6379/1")
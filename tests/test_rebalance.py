@@ -0,0 +1,139 @@
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # Lua scripting for the compare-and-delete
+
+from app import rebalance as rebalance_module
+from app import redis_store
+from app.hash_ring import HashRing
+
+OLD = {"a": "redis://a:6379/1", "b": "redis://b:6379/1"}
+NEW = {**OLD, "c": "redis://c:6379/1"}
+VNODES = 16
+
+
+@pytest.fixture
+def shards(monkeypatch):
+    clients = {url: fakeredis.FakeRedis() for url in NEW.values()}
+    monkeypatch.setattr(rebalance_module.redis.Redis, "from_url", lambda url, **kwargs: clients[url])
+    return {name: clients[url] for name, url in NEW.items()}
+
+
+def seed(shards, count=200):
+    """Write visits on their owner in the old ring; return the ids moving to c."""
+    old_ring, new_ring = HashRing(list(OLD), VNODES), HashRing(list(NEW), VNODES)
+    moving = []
+    for i in range(count):
+        visit_id = f"v{i}"
+        shards[old_ring.get_node(visit_id)].hset(f"visit:{visit_id}", mapping={"status": "created", "n": i})
+        if new_ring.get_node(visit_id) == "c":
+            moving.append(visit_id)
+    assert moving
+    return moving
+
+
+def run(**kwargs):
+    return rebalance_module.rebalance(OLD, NEW, vnodes=VNODES, batch_size=50, **kwargs)
+
+
+def test_moves_and_deletes_source(shards):
+    moving = seed(shards)
+    stats = run()
+    assert stats["scanned"] == 200
+    assert stats["moved"]["c"] == len(moving)
+    assert stats["failed"] == stats["conflicts"] == 0
+    for visit_id in moving:
+        key = f"visit:{visit_id}"
+        assert shards["c"].hget(key, "status") == b"created"
+        assert not shards["a"].exists(key) and not shards["b"].exists(key)
+    assert shards["a"].dbsize() + shards["b"].dbsize() == 200 - len(moving)
+
+
+def test_keeps_ttl(shards):
+    moving = seed(shards)
+    key = f"visit:{moving[0]}"
+    source = shards["a"] if shards["a"].exists(key) else shards["b"]
+    source.expire(key, 1000)
+    run()
+    assert 0 < shards["c"].ttl(key) <= 1000
+    assert shards["c"].ttl(f"visit:{moving[1]}") == -1
+
+
+def test_dry_run_writes_nothing(shards):
+    moving = seed(shards)
+    before = {name: client.dbsize() for name, client in shards.items()}
+    stats = run(dry_run=True)
+    assert stats["moved"]["c"] == len(moving)
+    assert {name: client.dbsize() for name, client in shards.items()} == before
+
+
+def test_busykey_counts_as_copied_and_keeps_target(shards):
+    moving = seed(shards)
+    key = f"visit:{moving[0]}"
+    # Already copied on access and updated since
+    shards["c"].hset(key, mapping={"status": "newer"})
+    stats = run()
+    assert shards["c"].hget(key, "status") == b"newer"
+    assert not shards["a"].exists(key) and not shards["b"].exists(key)
+    assert stats["moved"]["c"] == len(moving) - 1
+    assert stats["failed"] == stats["conflicts"] == 0
+
+
+def test_source_changed_mid_run_is_a_conflict(shards, monkeypatch):
+    moving = seed(shards)
+    key = f"visit:{moving[0]}"
+    source = shards["a"] if shards["a"].exists(key) else shards["b"]
+
+    register_script = source.register_script
+
+    def register_with_write(script):
+        delete = register_script(script)
+
+        def write_then_delete(keys, args):
+            # A straggler writes the source between RESTORE and the delete
+            source.hset(key, "status", "late write")
+            return delete(keys=keys, args=args)
+        return write_then_delete
+
+    monkeypatch.setattr(source, "register_script", register_with_write)
+    stats = run()
+    assert stats["conflicts"] == 1
+    assert source.hget(key, "status") == b"late write"
+    assert shards["c"].hget(key, "status") == b"created"
+
+
+@pytest.fixture
+def migrating_store(monkeypatch, shards):
+    monkeypatch.setattr(redis_store, "visit_ring", HashRing(list(NEW), VNODES))
+    monkeypatch.setattr(redis_store, "previous_ring", HashRing(list(OLD), VNODES))
+    monkeypatch.setattr(redis_store, "visit_clients", shards)
+    return shards
+
+
+def test_copy_on_access(migrating_store):
+    moving = seed(migrating_store)
+    visit_id = moving[0]
+    assert redis_store.get_visit_status(visit_id) == "created"
+    assert migrating_store["c"].hget(f"visit:{visit_id}", "n") == str(int(visit_id[1:])).encode()
+    redis_store.set_visit_status(visit_id, "processing")
+    assert migrating_store["c"].hget(f"visit:{visit_id}", "status") == b"processing"
+
+
+def test_copy_on_access_never_overwrites_target(migrating_store):
+    moving = seed(migrating_store)
+    visit_id = moving[0]
+    key = f"visit:{visit_id}"
+    migrating_store["c"].hset(key, mapping={"status": "newer"})
+    assert redis_store.get_visit_status(visit_id) == "newer"
+
+    source = migrating_store["a"] if migrating_store["a"].exists(key) else migrating_store["b"]
+    # Racing copy after the target was written: BUSYKEY, target untouched
+    assert redis_store.copy_visit_key(source, migrating_store["c"], key) is False
+    assert migrating_store["c"].hget(key, "status") == b"newer"
+
+
+def test_new_visit_during_migration(migrating_store):
+    redis_store.set_visit_type("fresh", "created", "followup")
+    owner = HashRing(list(NEW), VNODES).get_node("fresh")
+    assert migrating_store[owner].hget("visit:fresh", "type_of_visit") == b"followup"
+    assert sum(client.dbsize() for client in migrating_store.values()) == 1
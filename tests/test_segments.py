@@ -0,0 +1,96 @@
+import wave
+import pytest
+from app.segments import get_audio_duration, split_at_pauses, tree_merge
+
+RATE = 1000
+
+
+def write_wav(path, parts, channels=1, sampwidth=2):
+    """Write a WAV made of (seconds, loud) parts: a square wave or silence."""
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(sampwidth)
+        wf.setframerate(RATE)
+        for seconds, loud in parts:
+            frames = bytearray()
+            for i in range(int(seconds * RATE)):
+                sample = (8000 if i % 10 < 5 else -8000) if loud else 0
+                frames += sample.to_bytes(sampwidth, "little", signed=True) * channels
+            wf.writeframes(bytes(frames))
+    return str(path)
+
+
+def durations(paths):
+    return [round(get_audio_duration(p), 2) for p in paths]
+
+
+def test_cuts_inside_pause(tmp_path):
+    audio = write_wav(tmp_path / "in.wav", [(12, True), (1, False), (12, True)])
+    segments = split_at_pauses(audio, tmp_path / "out", min_segment=10, max_segment=30)
+    assert durations(segments) == [12.5, 12.5]
+    assert sum(durations(segments)) == get_audio_duration(audio)
+
+
+def test_no_cut_in_pause_before_min_segment(tmp_path):
+    audio = write_wav(tmp_path / "in.wav", [(5, True), (1, False), (20, True)])
+    segments = split_at_pauses(audio, tmp_path / "out", min_segment=10, max_segment=30)
+    assert durations(segments) == [26.0]
+
+
+def test_cuts_at_max_segment_without_pause(tmp_path):
+    audio = write_wav(tmp_path / "in.wav", [(25, True)])
+    segments = split_at_pauses(audio, tmp_path / "out", min_segment=5, max_segment=10)
+    assert durations(segments) == [10.0, 10.0, 5.0]
+
+
+def test_no_sliver_after_trailing_pause(tmp_path):
+    audio = write_wav(tmp_path / "in.wav", [(12, True), (1, False), (1, True)])
+    segments = split_at_pauses(audio, tmp_path / "out", min_segment=10, max_segment=30)
+    assert durations(segments) == [14.0]
+
+
+def test_stereo_keeps_format(tmp_path):
+    audio = write_wav(tmp_path / "in.wav", [(12, True), (1, False), (12, True)], channels=2)
+    segments = split_at_pauses(audio, tmp_path / "out", min_segment=10, max_segment=30)
+    assert durations(segments) == [12.5, 12.5]
+    with wave.open(segments[0], "rb") as wf:
+        assert wf.getnchannels() == 2
+        assert wf.getframerate() == RATE
+
+
+def test_empty_file_has_no_segments(tmp_path):
+    audio = write_wav(tmp_path / "in.wav", [])
+    assert split_at_pauses(audio, tmp_path / "out") == []
+
+
+def test_rejects_non_16_bit(tmp_path):
+    audio = write_wav(tmp_path / "in.wav", [(1, False)], sampwidth=1)
+    with pytest.raises(ValueError):
+        split_at_pauses(audio, tmp_path / "out")
+
+
+def _concat_pairs(rounds):
+    def merge_pairs(pairs):
+        rounds.append(len(pairs))
+        return [a + b for a, b in pairs]
+    return merge_pairs
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 5, 8, 29])
+def test_tree_merge_keeps_order(count):
+    items = [chr(ord("a") + i % 26) + str(i) for i in range(count)]
+    rounds = []
+    assert tree_merge(items, _concat_pairs(rounds)) == "".join(items)
+    # ceil(log2(count)) rounds, each merging every available pair at once
+    assert len(rounds) == (count - 1).bit_length()
+
+
+def test_tree_merge_odd_count_carries_last():
+    rounds = []
+    assert tree_merge(["a", "b", "c"], _concat_pairs(rounds)) == "abc"
+    assert rounds == [1, 1]
+
+
+def test_tree_merge_empty():
+    with pytest.raises(ValueError):
+        tree_merge([], _concat_pairs([]))